@@ -1,9 +1,34 @@
 let results_index = [];
+let loadedProfiles = [];
+
+// Parsing and series extraction run in worker.js, see callWorker()
+const worker = new Worker("worker.js");
+const pendingRequests = new Map();
+let nextRequestId = 0;
+
+worker.onmessage = (e) => {
+  const { id, result, error } = e.data;
+  const request = pendingRequests.get(id);
+  pendingRequests.delete(id);
+  if (error) {
+    request.reject(new Error(error));
+  } else {
+    request.resolve(result);
+  }
+};
+
+function callWorker(message) {
+  return new Promise((resolve, reject) => {
+    const id = ++nextRequestId;
+    pendingRequests.set(id, { resolve, reject });
+    worker.postMessage({ id, ...message });
+  });
+}
 
 fetch("results.json")
   .then((r) => {
     if (r.ok) {
-      results_index.push({ path: "results.json", name: "Default Results" });
+      results_index.push({ path: "results.json", name: "Default Results", indexed: false });
     }
   })
   .then(() => {
@@ -19,10 +44,19 @@ fetch("results.json")
   .finally(() => {
     populateProfileDropdown(results_index);
     if (results_index.length > 0) {
-      loadProfile(results_index[0].path, results_index[0].name);
+      $("#profileDropdown").dropdown("set selected", results_index[0].path);
     }
   });
 
+// Same rule as history.device_name(): entries of results_index.json are named "<device> <profile>"
+function deviceName(path) {
+  const entry = results_index.find((e) => e.path === path);
+  if (entry && entry.indexed !== false) {
+    return entry.name.slice(0, entry.name.lastIndexOf(" "));
+  }
+  return path.split("/").pop().replace(/\.json$/, "");
+}
+
 function populateProfileDropdown(profiles) {
   const menu = document.getElementById("profileMenu");
   const dropdown = document.getElementById("profileDropdown");
@@ -37,28 +71,41 @@ function populateProfileDropdown(profiles) {
   });
 
   $(dropdown).dropdown({
-    onChange: function (value, text) {
-      loadProfile(value, text);
+    onChange: function (value) {
+      loadProfiles(value ? value.split(",") : []);
     },
   });
 
-  dropdown.querySelector(".default.text").textContent = "Select a profile";
+  dropdown.querySelector(".default.text").textContent = "Select profiles";
   if (document.getElementById("metricSelect")) {
     $("#metricSelect").dropdown();
   }
 }
 
-function loadProfile(path, name) {
-  fetch(path)
-    .then((r) => r.json())
-    .then((data) => {
-      window._resultsData = data.results;
-
-      buildTree(data.results);
-      displayProfileInfo(data);
+let loadId = 0;
+
+function loadProfiles(paths) {
+  // Only the latest selection is shown, however the loads finish
+  const currentId = ++loadId;
+  Promise.all(
+    paths.map((path) =>
+      callWorker({ type: "load", path }).then((data) => ({
+        path,
+        name: results_index.find((entry) => entry.path === path)?.name || path,
+        ...data,
+      }))
+    )
+  )
+    .then((profiles) => {
+      if (currentId !== loadId) {
+        return;
+      }
+      loadedProfiles = profiles;
 
-      const dropdown = document.getElementById("profileDropdown");
-      dropdown.querySelector(".text").textContent = name;
+      const keys = new Set();
+      profiles.forEach((p) => Object.keys(p.tests).forEach((k) => keys.add(k)));
+      buildTree(Array.from(keys).sort());
+      displayProfileInfo(profiles);
 
       refresh();
     })
@@ -67,12 +114,18 @@ function loadProfile(path, name) {
     });
 }
 
-function displayProfileInfo(data) {
+function displayProfileInfo(profiles) {
   const infoDiv = document.getElementById("profileInfo");
   const detailsDiv = document.getElementById("profileDetails");
 
-  infoDiv.style.display = "block";
+  infoDiv.style.display = profiles.length ? "block" : "none";
+  detailsDiv.innerHTML = profiles
+    .map((p) => (profiles.length > 1 ? `<h4 class="ui header">${htmlEscape(p.name)}</h4>` : "") + profileInfoHtml(p))
+    .join("");
+  $(infoDiv).find(".ui.accordion").accordion();
+}
 
+function profileInfoHtml(data) {
   let html = "";
 
   if (data.profile) {
@@ -126,11 +179,10 @@ function displayProfileInfo(data) {
     }
   }
 
-  detailsDiv.innerHTML = html;
-  $(infoDiv).find(".ui.accordion").accordion();
+  return html;
 }
 
-function buildTree(results) {
+function buildTree(keys) {
   function buildNestedTree(keys) {
     const root = new Map();
     for (const key of keys) {
@@ -161,62 +213,30 @@ function buildTree(results) {
   }
 
   const tree = document.getElementById("tree");
-  tree.innerHTML = renderTree(buildNestedTree(Object.keys(results)));
+  // Keep the selection when profiles are added or removed
+  const checked = new Set(
+    Array.from(tree.querySelectorAll("input[type=checkbox]:checked")).map((c) => c.id.replace("data-key-", ""))
+  );
+  tree.innerHTML = renderTree(buildNestedTree(keys));
 
   $("#tree>.accordion").accordion({ exclusive: false, duration: 100 });
 
   const checkboxes = tree.querySelectorAll("input[type=checkbox]");
   checkboxes.forEach((cb) => {
+    cb.checked = checked.has(cb.id.replace("data-key-", ""));
     cb.onchange = () => {
       refresh();
     };
   });
 }
 
-function getMetricAccessors(metric) {
-  if (metric === "time_ns") {
-    return {
-      meanKeys: ["time_ns_mean", "mean"],
-      stdKeys: ["time_ns_stddev", "stddev"],
-      minKeys: ["time_ns_min", "min"],
-      maxKeys: ["time_ns_max", "max"],
-    };
-  }
-  if (metric === "constant") {
-    return {
-      meanKeys: ["constant_mean", "mean_c"],
-      stdKeys: ["constant_stddev", "stddev_c"],
-      minKeys: ["constant_min", "min_c"],
-      maxKeys: ["constant_max", "max_c"],
-    };
-  }
-  return {
-    meanKeys: [`${metric}_mean`, metric],
-    stdKeys: [`${metric}_stddev`],
-    minKeys: [`${metric}_min`],
-    maxKeys: [`${metric}_max`],
-  };
-}
-
-function getFirstFiniteValue(obj, keys) {
-  for (const key of keys) {
-    if (obj[key] !== undefined && obj[key] !== null) {
-      const num = Number(obj[key]);
-      if (Number.isFinite(num)) {
-        return num;
-      }
-    }
-  }
-  return undefined;
-}
-
-function showOverlayPlot(resultsArr, keysArr) {
+function showOverlayPlot(selection, seriesList) {
   const plotDiv = document.getElementById("plot");
   const detailsDiv = document.getElementById("details");
   const metric = document.getElementById("metricSelect")?.value || "time_ns";
   const use_c = metric === "constant";
-  if (!resultsArr.length) {
-    plotDiv.innerHTML = "";
+  if (!selection.length) {
+    Plotly.purge(plotDiv);
     detailsDiv.style.display = "none";
     return;
   }
@@ -225,18 +245,17 @@ function showOverlayPlot(resultsArr, keysArr) {
   let yType = "log";
 
   const showLines = document.getElementById("linesToggle")?.checked;
-  const showMinMax = document.getElementById("minmaxToggle")?.checked;
   const logRegex = /O\((log n|logn)\)/i;
-  if (use_c || metric !== "time_ns") {
+  const allPaired = selection.every((s) => s.meta.type === "paired");
+  if (use_c || metric !== "time_ns" || allPaired) {
     yType = "linear";
-  } else if (resultsArr.length > 0) {
-    const allLogLinear = resultsArr.every((r) => logRegex.test(r.complexity));
+  } else {
+    const allLogLinear = selection.every((s) => logRegex.test(s.meta.complexity));
     if (allLogLinear) {
       yType = "linear";
     }
   }
 
-  const traces = [];
   const colorScheme = [
     "#1f77b4",
     "#ff7f0e",
@@ -250,63 +269,27 @@ function showOverlayPlot(resultsArr, keysArr) {
     "#17becf",
   ];
 
-  resultsArr.forEach((result, idx) => {
-    const xs = [];
-    const ys = [];
-    const errors = [];
-    const errors2 = [];
-    const access = getMetricAccessors(metric);
-
-    result.stats.forEach((d) => {
-      const n = Number(d.n);
-      const meanVal = getFirstFiniteValue(d, access.meanKeys);
-      if (!Number.isFinite(meanVal)) {
-        return;
-      }
-      const stdVal = getFirstFiniteValue(d, access.stdKeys);
-      const minVal = getFirstFiniteValue(d, access.minKeys);
-      const maxVal = getFirstFiniteValue(d, access.maxKeys);
-
-      xs.push(n);
-      ys.push(meanVal);
-
-      if (showMinMax) {
-        if (Number.isFinite(minVal) && Number.isFinite(maxVal)) {
-          errors2.push(Math.max(0, meanVal - minVal));
-          errors.push(Math.max(0, maxVal - meanVal));
-        } else if (Number.isFinite(stdVal)) {
-          errors2.push(stdVal);
-          errors.push(stdVal);
-        } else {
-          errors2.push(0);
-          errors.push(0);
-        }
-      } else if (Number.isFinite(stdVal)) {
-        errors.push(stdVal);
-      } else {
-        errors.push(0);
-      }
-    });
-
-    if (xs.length === 0) {
-      return;
-    }
-
-    traces.push({
-      x: xs,
-      y: ys,
-      error_y: showMinMax
-        ? { type: "data", symmetric: false, array: errors, arrayminus: errors2, visible: true }
-        : { type: "data", array: errors, visible: true },
-      mode: showLines ? "lines+markers" : "markers",
-      type: "scatter",
-      name: keysArr[idx],
-      marker: { color: colorScheme[idx % colorScheme.length] },
+  const traces = [];
+  selection.forEach((s, idx) => {
+    seriesList[idx].forEach((series) => {
+      const name = series.label ? `${s.name}: ${series.label}` : s.name;
+      traces.push({
+        x: series.x,
+        y: series.y,
+        error_y: series.errors2
+          ? { type: "data", symmetric: false, array: series.errors, arrayminus: series.errors2, visible: true }
+          : { type: "data", array: series.errors, visible: true },
+        mode: showLines ? "lines+markers" : "markers",
+        type: "scatter",
+        name,
+        marker: { color: colorScheme[traces.length % colorScheme.length] },
+      });
     });
   });
 
+  const keysArr = Array.from(new Set(selection.map((s) => s.key)));
   const metricLabel = document.querySelector(`#metricSelect option[value="${metric}"]`)?.textContent || metric;
-  const yTitle = use_c ? "Time / Complexity" : metricLabel;
+  const yTitle = allPaired ? "Time ratio to baseline" : use_c ? "Time / Complexity" : metricLabel;
   const plotLayout = {
     title: keysArr.join(" + "),
     xaxis: { title: "Input size (n)", type: xType },
@@ -319,14 +302,16 @@ function showOverlayPlot(resultsArr, keysArr) {
     margin: { t: 40 },
   };
 
-  Plotly.newPlot(plotDiv, traces, plotLayout, { responsive: true });
+  // Plotly.react only updates what changed, instead of rebuilding the plot
+  Plotly.react(plotDiv, traces, plotLayout, { responsive: true });
   detailsDiv.style.display = "";
-  detailsDiv.innerHTML = resultsArr
-    .map((result, idx) => {
-      const constantMax = Number(result.constant_max ?? result.max_c);
+  detailsDiv.innerHTML = keysArr
+    .map((key) => {
+      const result = selection.find((s) => s.key === key).meta;
+      const constantMax = Number(result.constant_max);
       const constantText = Number.isFinite(constantMax) ? constantMax.toFixed(3) : "N/A";
       return [
-        `<b>Algorithm:</b> ${keysArr[idx]}`,
+        `<b>Algorithm:</b> ${key}`,
         `<b>Type:</b> ${result.type}`,
         `<b>Complexity:</b> ${result.complexity}`,
         `<b>Max Constant:</b> ${constantText}`,
@@ -336,6 +321,42 @@ function showOverlayPlot(resultsArr, keysArr) {
     .join("<hr>");
 }
 
+function showHistoryPlot(seriesList, metricLabel) {
+  const plotDiv = document.getElementById("historyPlot");
+  if (!plotDiv) {
+    return;
+  }
+  if (seriesList.length === 0) {
+    Plotly.purge(plotDiv);
+    plotDiv.style.minHeight = "";
+    return;
+  }
+  // One trace per n, grouped in the legend by device and profile
+  const traces = seriesList.map((series) => ({
+    x: series.x,
+    y: series.y,
+    mode: "lines+markers",
+    type: "scatter",
+    name: `${series.group} n=${series.n}`,
+    legendgroup: series.group,
+  }));
+  plotDiv.style.minHeight = "400px";
+  Plotly.react(
+    plotDiv,
+    traces,
+    {
+      title: "History",
+      xaxis: { title: "Run time", type: "date" },
+      yaxis: { title: metricLabel, rangemode: "tozero" },
+      legend: { orientation: "h" },
+      margin: { t: 40 },
+    },
+    { responsive: true }
+  );
+}
+
+let refreshId = 0;
+
 function refresh() {
   const tree = document.getElementById("tree");
   if (!tree) {
@@ -343,15 +364,48 @@ function refresh() {
   }
   const checked = Array.from(tree.querySelectorAll("input[type=checkbox]:checked"));
   const selectedKeys = checked.map((c) => c.id.replace("data-key-", ""));
-  if (window._resultsData) {
-    const selectedEntries = selectedKeys
-      .map((k) => ({ key: k, result: window._resultsData[k] }))
-      .filter((entry) => Boolean(entry.result));
-    showOverlayPlot(
-      selectedEntries.map((entry) => entry.result),
-      selectedEntries.map((entry) => entry.key)
-    );
-  }
+  const selection = [];
+  selectedKeys.forEach((key) => {
+    loadedProfiles.forEach((p) => {
+      if (p.tests[key]) {
+        selection.push({
+          path: p.path,
+          key,
+          name: loadedProfiles.length > 1 ? `${p.name}: ${key}` : key,
+          meta: p.tests[key],
+        });
+      }
+    });
+  });
+
+  // Responses to superseded refreshes are dropped
+  const id = ++refreshId;
+  const metric = document.getElementById("metricSelect")?.value || "time_ns";
+  const metricLabel = document.querySelector(`#metricSelect option[value="${metric}"]`)?.textContent || metric;
+  Promise.all([
+    callWorker({
+      type: "series",
+      selection: selection.map((s) => ({ path: s.path, key: s.key })),
+      metric,
+      showMinMax: Boolean(document.getElementById("minmaxToggle")?.checked),
+    }),
+    callWorker({
+      type: "history",
+      keys: selectedKeys,
+      runs: loadedProfiles.map((p) => ({ device: deviceName(p.path), profile: p.profile?.name })),
+      metric,
+    }),
+  ])
+    .then(([seriesList, historySeries]) => {
+      if (id !== refreshId) {
+        return;
+      }
+      showOverlayPlot(selection, seriesList);
+      showHistoryPlot(historySeries, metricLabel);
+    })
+    .catch((err) => {
+      console.error("Failed to build plot:", err);
+    });
 }
 
 function htmlEscape(str) {
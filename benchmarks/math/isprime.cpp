@@ -83,6 +83,15 @@ int main(int argc, char *argv[]) {
 
     printf("math.isprime.common.random:\t%lld %d %llu\n", (ll)BENCHMARK_N, repeats2 * 2, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (ll x = n - repeats2; x < n + repeats2; ++x) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(isprime_common(x));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.common.random");
+    }
+
     st = get_cpu_time();
     for (ll x = n - repeats2; x < n + repeats2; ++x) {
         DoNotOptimize(isprime_6kpm(x));
@@ -91,6 +100,15 @@ int main(int argc, char *argv[]) {
 
     printf("math.isprime.6kpm.random:\t%lld %d %llu\n", (ll)BENCHMARK_N, repeats2 * 2, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (ll x = n - repeats2; x < n + repeats2; ++x) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(isprime_6kpm(x));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.6kpm.random");
+    }
+
     st = get_cpu_time();
     for (ll x = n - 500; x < n + 500; ++x) {
         DoNotOptimize(miller_rabin(x));
@@ -99,6 +117,15 @@ int main(int argc, char *argv[]) {
 
     printf("math.isprime.miller_rabin.random:\t%lld %d %llu\n", (ll)BENCHMARK_N, 1000, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (ll x = n - 500; x < n + 500; ++x) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(miller_rabin(x));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.miller_rabin.random");
+    }
+
     int i = 0;
     while (i < 400) {
         ll x = BENCHMARK_N - range + rng() % (range * 2);
@@ -114,6 +141,15 @@ int main(int argc, char *argv[]) {
     et = get_cpu_time();
     printf("math.isprime.common.prime:\t%lld %d %llu\n", (ll)BENCHMARK_N, repeats, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (i = 0; i < repeats; i++) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(isprime_common(a[i]));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.common.prime");
+    }
+
     st = get_cpu_time();
     for (i = 0; i < repeats; i++) {
         DoNotOptimize(isprime_6kpm(a[i]));
@@ -121,6 +157,15 @@ int main(int argc, char *argv[]) {
     et = get_cpu_time();
     printf("math.isprime.6kpm.prime:\t%lld %d %llu\n", (ll)BENCHMARK_N, repeats, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (i = 0; i < repeats; i++) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(isprime_6kpm(a[i]));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.6kpm.prime");
+    }
+
     st = get_cpu_time();
     for (i = 0; i < 400; i++) {
         DoNotOptimize(miller_rabin(a[i]));
@@ -128,5 +173,36 @@ int main(int argc, char *argv[]) {
     et = get_cpu_time();
     printf("math.isprime.miller_rabin.prime:\t%lld %d %llu\n", (ll)BENCHMARK_N, 400, et - st);
 
+    if (benchmark_samples_enabled) {
+        for (i = 0; i < 400; i++) {
+            ull s = benchmark_sample_start();
+            DoNotOptimize(miller_rabin(a[i]));
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("math.isprime.miller_rabin.prime");
+    }
+
+    ll x0 = n;
+    benchmark_paired(
+        "math.isprime.paired.random", 3, 5,
+        [&](int v, ull seed) {
+            x0 = BENCHMARK_N - range + (ll)(seed % (range * 2));
+        },
+        [&](int v) {
+            if (v == 0) {
+                for (ll x = x0 - repeats2; x < x0 + repeats2; ++x) {
+                    DoNotOptimize(isprime_common(x));
+                }
+            } else if (v == 1) {
+                for (ll x = x0 - repeats2; x < x0 + repeats2; ++x) {
+                    DoNotOptimize(isprime_6kpm(x));
+                }
+            } else {
+                for (ll x = x0 - repeats2; x < x0 + repeats2; ++x) {
+                    DoNotOptimize(miller_rabin(x));
+                }
+            }
+        });
+
     return 0;
 }
@@ -31,5 +31,16 @@ int main(int argc, char *argv[]) {
     ull et2 = get_cpu_time();
 
     printf("misc.memset.hot_0:\t%d %.10f\n", BENCHMARK_N, (double)(et2 - st2) / BENCHMARK_MICRO_REPEATS);
+
+    if (benchmark_samples_enabled) {
+        // Samples past the buffer capacity would be dropped anyway
+        for (int i = 0; i < std::min(BENCHMARK_MICRO_REPEATS, BENCHMARK_SAMPLES_CAPACITY); ++i) {
+            ull s = benchmark_sample_start();
+            memset(a, 0, sizeof(a));
+            DoNotOptimize(a[0]);
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("misc.memset.hot_0");
+    }
     return 0;
 }
\ No newline at end of file
@@ -43,5 +43,18 @@ int main(int argc, char *argv[]) {
 
     printf("misc.sort.int_random:\t%d %llu\n", BENCHMARK_N, et3 - st3);
 
+    benchmark_paired(
+        "misc.sort.int_paired", 3, 3,
+        [&](int v, ull seed) {
+            std::minstd_rand g(seed);
+            for (int i = 0; i < BENCHMARK_N; i++) {
+                a[i] = v == 0 ? i : v == 1 ? BENCHMARK_N - i : g();
+            }
+        },
+        [&](int v) {
+            std::sort(a, a + BENCHMARK_N);
+            DoNotOptimize(a[0]);
+        });
+
     return 0;
 }
@@ -21,5 +21,16 @@ int main(int argc, char *argv[]) {
 
     printf("misc.strlen:\t%d %d %llu\n", BENCHMARK_N, BENCHMARK_MICRO_REPEATS, et1 - st1);
 
+    if (benchmark_samples_enabled) {
+        // Samples past the buffer capacity would be dropped anyway
+        for (int i = 0; i < std::min(BENCHMARK_MICRO_REPEATS, BENCHMARK_SAMPLES_CAPACITY); ++i) {
+            ull s = benchmark_sample_start();
+            volatile size_t len = strlen(a);
+            DoNotOptimize(len);
+            benchmark_sample_stop(s);
+        }
+        benchmark_flush_samples("misc.strlen");
+    }
+
     return 0;
 }
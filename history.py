@@ -0,0 +1,249 @@
+import os
+import argparse
+import json
+import re
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    profile_json TEXT NOT NULL,
+    environment_json TEXT NOT NULL,
+    UNIQUE (device, profile, timestamp)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    test TEXT NOT NULL,
+    device TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    n REAL NOT NULL,
+    measured_at TEXT NOT NULL,
+    stats_json TEXT NOT NULL,
+    UNIQUE (test, device, profile, n, measured_at)
+);
+CREATE INDEX IF NOT EXISTS stats_by_run ON stats (run_id);
+CREATE INDEX IF NOT EXISTS runs_by_timestamp ON runs (timestamp);
+"""
+
+# Stat names used by older results files
+LEGACY_METRICS = {
+    "time_ns_mean": "mean",
+    "time_ns_stddev": "stddev",
+    "time_ns_min": "min",
+    "time_ns_max": "max",
+    "constant_mean": "mean_c",
+    "constant_stddev": "stddev_c",
+    "constant_min": "min_c",
+    "constant_max": "max_c",
+}
+
+
+def metric_value(stat, metric):
+    if metric in stat:
+        return stat[metric]
+    return stat.get(LEGACY_METRICS.get(metric))
+
+
+def connect(db_path):
+    db = sqlite3.connect(db_path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def ingest(db_path, results, device):
+    # Append one results file to the store. Stats reused from an earlier run keep their
+    # original measured_at and are skipped, so re-ingesting never duplicates a measurement.
+    db = connect(db_path)
+    profile = results.get("profile", {})
+    environment = results.get("environment", {})
+    timestamp = environment.get("timestamp", "")
+
+    with db:
+        db.execute(
+            "INSERT OR IGNORE INTO runs (device, profile, timestamp, profile_json, environment_json) VALUES (?, ?, ?, ?, ?)",
+            (device, profile.get("name", ""), timestamp, json.dumps(profile), json.dumps(environment)),
+        )
+        run_id = db.execute(
+            "SELECT id FROM runs WHERE device = ? AND profile = ? AND timestamp = ?",
+            (device, profile.get("name", ""), timestamp),
+        ).fetchone()[0]
+
+        added = 0
+        for testid, result in results.get("results", {}).items():
+            for stat in result.get("stats", []):
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO stats (run_id, test, device, profile, n, measured_at, stats_json) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        testid,
+                        device,
+                        profile.get("name", ""),
+                        stat["n"],
+                        stat.get("measured_at", timestamp),
+                        json.dumps(stat),
+                    ),
+                )
+                added += cursor.rowcount
+
+    db.close()
+    return added
+
+
+def regex_prefix(pattern):
+    # Literal text every re.match of the pattern starts with, or "" if that is not obvious
+    if "|" in pattern:
+        return ""
+    prefix = []
+    i = 1 if pattern.startswith("^") else 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            prefix.append(pattern[i + 1])
+            i += 2
+            continue
+        if c in ".^$*+?{}[]()\\":
+            if c in "*?{":
+                # The previous character is optional or repeated
+                prefix = prefix[:-1]
+            break
+        prefix.append(c)
+        i += 1
+    return "".join(prefix)
+
+
+def select_stats(db, test_filter=None, device=None, profile=None, n=None):
+    # Stored stats sorted by test, device, profile, n and time, as (test, device, profile, n, measured_at, stat)
+    sql = "SELECT stats.test, stats.device, stats.profile, stats.n, stats.measured_at, stats.stats_json FROM stats WHERE 1"
+    params = []
+    prefix = regex_prefix(test_filter) if test_filter else ""
+    if prefix:
+        # Lets SQLite use the (test, ...) unique index, the regex still filters the rows it returns
+        sql += " AND stats.test GLOB ?"
+        params.append(re.sub(r"([*?[])", r"[\1]", prefix) + "*")
+    if device is not None:
+        sql += " AND stats.device = ?"
+        params.append(device)
+    if profile is not None:
+        sql += " AND stats.profile = ?"
+        params.append(profile)
+    if n is not None:
+        sql += " AND stats.n = ?"
+        params.append(n)
+    sql += " ORDER BY stats.test, stats.device, stats.profile, stats.n, stats.measured_at"
+
+    for testid, row_device, row_profile, row_n, measured_at, stats_json in db.execute(sql, params):
+        if test_filter and re.match(test_filter, testid) is None:
+            continue
+        yield testid, row_device, row_profile, row_n, measured_at, json.loads(stats_json)
+
+
+def query(db_path, test_filter=None, device=None, profile=None, n=None, metric="constant_mean"):
+    db = connect(db_path)
+    rows = []
+    for testid, row_device, row_profile, row_n, measured_at, stat in select_stats(db, test_filter, device, profile, n):
+        value = metric_value(stat, metric)
+        if value is None:
+            continue
+        rows.append(
+            {
+                "test": testid,
+                "device": row_device,
+                "profile": row_profile,
+                "n": row_n,
+                "measured_at": measured_at,
+                "value": value,
+            }
+        )
+    db.close()
+    return rows
+
+
+# Stats the web page can plot over time, one per entry of its metric dropdown that most results have
+EXPORT_METRICS = ["time_ns_mean", "constant_mean", "time_ns_p50", "time_ns_p99", "time_ns_p999"]
+# Number of n exported per test, device and profile unless one n is chosen
+EXPORT_N_COUNT = 5
+
+
+def export(db_path, test_filter=None, metrics=EXPORT_METRICS, n=None):
+    # Per test, device/profile and n, the metrics at each time they were measured. Runs cover different
+    # n, so aggregating over n would move with coverage instead of with performance. Instead only n itself,
+    # or a few n spread over the range, are exported. Every run draws n from the same generator grid,
+    # so these are the same n across runs.
+    db = connect(db_path)
+    groups = {}
+    for testid, device, profile, row_n, measured_at, stat in select_stats(db, test_filter, n=n):
+        values = [metric_value(stat, metric) for metric in metrics]
+        if all(value is None for value in values):
+            continue
+        points = groups.setdefault((testid, device, profile), {}).setdefault(row_n, [])
+        points.append({"timestamp": measured_at, "values": values})
+    db.close()
+
+    tests = {}
+    for (testid, device, profile), by_n in groups.items():
+        ns = sorted(by_n.keys())
+        if len(ns) > EXPORT_N_COUNT:
+            ns = [ns[round(i * (len(ns) - 1) / (EXPORT_N_COUNT - 1))] for i in range(EXPORT_N_COUNT)]
+        for row_n in ns:
+            tests.setdefault(testid, []).append({"device": device, "profile": profile, "n": row_n, "points": by_n[row_n]})
+    return {"metrics": metrics, "tests": tests}
+
+
+def device_name(results_path, results_index_path="results_index.json"):
+    # Device names are only recorded in results_index.json entries ("<device> <profile>"), where
+    # profile names never contain spaces but device names may
+    if os.path.exists(results_index_path):
+        for entry in json.load(open(results_index_path, "r", encoding="utf-8")):
+            if os.path.abspath(entry["path"]) == os.path.abspath(results_path):
+                return entry["name"].rsplit(" ", 1)[0]
+    return os.path.splitext(os.path.basename(results_path))[0]
+
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    parser = argparse.ArgumentParser(description="Query the historical results store.")
+    parser.add_argument("--db", type=str, help="Path to the results database", required=False, default="history.db")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Append results files to the database")
+    ingest_parser.add_argument("files", type=str, nargs="+", help="Results files to ingest")
+    ingest_parser.add_argument("-d", "--device", type=str, help="Device name, guessed from results_index.json if omitted")
+
+    query_parser = subparsers.add_parser("query", help="Print stored values of a metric")
+    query_parser.add_argument("--test-filter", type=str, help="Only tests matching this regex", default=None)
+    query_parser.add_argument("-d", "--device", type=str, help="Only this device", default=None)
+    query_parser.add_argument("--profile", type=str, help="Only this profile name", default=None)
+    query_parser.add_argument("-n", type=float, help="Only this input size", default=None)
+    query_parser.add_argument("-m", "--metric", type=str, help="Stat to print", default="constant_mean")
+
+    export_parser = subparsers.add_parser("export", help="Export metric trends as JSON for the web page")
+    export_parser.add_argument("--test-filter", type=str, help="Only tests matching this regex", default=None)
+    export_parser.add_argument("-m", "--metrics", type=str, nargs="+", help="Stats to export", default=EXPORT_METRICS)
+    export_parser.add_argument("-n", type=float, help="Only this input size", default=None)
+    export_parser.add_argument("-o", "--output", type=str, help="Output file", default="history.json")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        for path in args.files:
+            results = json.load(open(path, "r", encoding="utf-8"))
+            device = args.device or device_name(path)
+            added = ingest(args.db, results, device)
+            print(f"{path}: {added} new stats for device {device}")
+    elif args.command == "query":
+        for row in query(args.db, args.test_filter, args.device, args.profile, args.n, args.metric):
+            print(
+                f"{row['measured_at']}  {row['device']:<16} {row['profile']:<36} {row['test']:<40} n={row['n']:<12g} {row['value']:.6g}"
+            )
+    elif args.command == "export":
+        output = export(args.db, args.test_filter, args.metrics, args.n)
+        json.dump(output, open(args.output, "w", encoding="utf-8"), separators=(",", ":"))
+        print(f"Exported {', '.join(args.metrics)} history to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
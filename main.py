@@ -1,5 +1,8 @@
 import math
 import os
+import array
+import bisect
+import struct
 import argparse
 import json
 import re
@@ -10,6 +13,8 @@ import random
 import hashlib
 import time
 
+import history
+
 
 def colorize(text, color):
     colors = {
@@ -217,6 +222,14 @@ def generator(
     return ret
 
 
+def format_defines(defs):
+    defines = []
+    for k, v in defs.items():
+        v = str(v)
+        defines.append(f"-D{k}={v}")
+    return " ".join(defines)
+
+
 def compile_source(source, profile, defs={}):
     global tsc_freq, process_priority, cpu_affinity
 
@@ -226,6 +239,8 @@ def compile_source(source, profile, defs={}):
         defs["BENCHMARK_CPU_AFFINITY"] = str(int(cpu_affinity))
 
     defs["BENCHMARK_TSC_FREQ"] = f"{tsc_freq:.10f}"
+    if source.get("samples", False):
+        defs["BENCHMARK_SAMPLES"] = "1"
 
     if os.path.exists("temp"):
         shutil.rmtree("temp")
@@ -239,12 +254,7 @@ def compile_source(source, profile, defs={}):
 
     open(source_path, "w").write(source)
 
-    defines = []
-    for k, v in defs.items():
-        v = str(v)
-        defines.append(f"-D{k}={v}")
-
-    compile_command = profile["build_command"].format(output=output_path, source_path=source_path, defines=" ".join(defines))
+    compile_command = profile["build_command"].format(output=output_path, source_path=source_path, defines=format_defines(defs))
     print(colorize(compile_command, "magenta"))
 
     subprocess.run(compile_command, shell=True, check=True)
@@ -255,16 +265,205 @@ def compile_source(source, profile, defs={}):
     return output_path
 
 
+R_X86_64_IRELATIVE = 37
+
+
+def run_objdump(args):
+    return subprocess.run(["objdump"] + args, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True).stdout
+
+
+def read_irelative_targets(executable_path):
+    # Static binaries call IFUNCs such as memset or strlen through PLT slots filled at startup
+    # by R_X86_64_IRELATIVE relocations. Map each slot to the resolver that picks the implementation.
+    targets = {}
+    try:
+        dump = run_objdump(["-s", "-j", ".rela.plt", executable_path])
+    except subprocess.CalledProcessError:
+        return targets
+    data = bytearray()
+    for line in dump.splitlines():
+        m = re.match(r"^ [0-9a-f]+ ((?:[0-9a-f]+ ){1,4})", line)
+        if m:
+            data += bytes.fromhex(m.group(1).replace(" ", ""))
+    for i in range(0, len(data) - 23, 24):
+        offset, info, addend = struct.unpack_from("<QQq", data, i)
+        if info & 0xFFFFFFFF == R_X86_64_IRELATIVE:
+            targets[offset] = addend
+    return targets
+
+
+FUNCTION_RE = re.compile(r"^([0-9a-f]+) <(.*)>:$", re.M)
+INSTRUCTION_RE = re.compile(r"^\s*([0-9a-f]+):\t(.*)$", re.M)
+REFERENCE_RE = re.compile(r"\b([0-9a-f]+) <")
+RIP_RELATIVE_RE = re.compile(r"-?0x[0-9a-f]+\(%rip\)")
+
+
+def normalize_instructions(lines):
+    # Strip addresses and rip-relative displacements, keeping the symbols they refer to
+    text = "\n".join(line.rstrip() for line in lines)
+    return RIP_RELATIVE_RE.sub("(%rip)", REFERENCE_RE.sub("<", text))
+
+
+DATA_SECTIONS = [".rodata", ".tdata", ".data.rel.ro", ".data"]
+SECTION_RE = re.compile(r"^\s*\d+ (\S+)\s+([0-9a-f]+)\s+[0-9a-f]+\s+[0-9a-f]+\s+([0-9a-f]+)\s", re.M)
+
+
+def hash_data_sections(executable_path):
+    # The normalized disassembly only names the data it refers to, so constants such as
+    # lookup tables and string literals are covered by hashing the data section bytes
+    md5 = hashlib.md5()
+    total = 0
+    with open(executable_path, "rb") as f:
+        for name, size, offset in SECTION_RE.findall(run_objdump(["-h", executable_path])):
+            if name in DATA_SECTIONS:
+                f.seek(int(offset, 16))
+                md5.update(name.encode())
+                md5.update(f.read(int(size, 16)))
+                total += int(size, 16)
+    return total, md5.hexdigest()
+
+
+def fingerprint_executable(executable_path, defs):
+    # Hash the disassembly of main and of everything it reaches in the linked executable, including
+    # statically linked libc and every implementation an IFUNC resolver may choose on this machine.
+    # Returns (hash, chunks) or None. The chunks are the functions named in temp/source.cpp, one each,
+    # followed by summary lines hashing the library code they call and the data sections.
+    if shutil.which("objdump") is None:
+        return None
+
+    try:
+        text = run_objdump(["-d", "-C", "--no-show-raw-insn", executable_path])
+        irelative = read_irelative_targets(executable_path)
+        data_size, data_hash = hash_data_sections(executable_path)
+    except subprocess.CalledProcessError as e:
+        print(colorize(f"Failed to disassemble executable: {e}", "yellow"))
+        return None
+
+    functions = {}
+    parts = FUNCTION_RE.split(text)
+    for i in range(1, len(parts) - 2, 3):
+        start = int(parts[i], 16)
+        instructions = INSTRUCTION_RE.findall(parts[i + 2])
+        functions[start] = {
+            "name": parts[i + 1],
+            "end": int(instructions[-1][0], 16) if instructions else start,
+            "body": parts[i + 2],
+            "lines": [x[1] for x in instructions],
+        }
+
+    starts = sorted(functions.keys())
+
+    def owner(address):
+        address = irelative.get(address, address)
+        i = bisect.bisect_right(starts, address) - 1
+        if i >= 0 and address <= functions[starts[i]]["end"]:
+            return starts[i]
+        return None
+
+    main_address = next((k for k, v in functions.items() if v["name"] == "main"), None)
+    if main_address is None:
+        print(colorize(f"No main function found in {executable_path}", "yellow"))
+        return None
+
+    # Follow calls, jumps and address references, which also covers resolvers returning implementations
+    reachable = {main_address}
+    pending = [main_address]
+    while pending:
+        for reference in REFERENCE_RE.findall(functions[pending.pop()]["body"]):
+            target = owner(int(reference, 16))
+            if target is not None and target not in reachable:
+                reachable.add(target)
+                pending.append(target)
+
+    identifiers = set(re.findall(r"[A-Za-z_]\w*", open("temp/source.cpp", "r").read()))
+    own = []
+    library = []
+    for address in sorted(reachable):
+        function = functions[address]
+        prefix = re.split(r"[(<]", function["name"], 1)[0]
+        if identifiers.intersection(re.findall(r"[A-Za-z_]\w*", prefix)):
+            own.append(normalize_instructions([f"<{function['name']}>:"] + function["lines"]))
+        else:
+            library.append(f"<{function['name']}>:")
+            library.extend(function["lines"])
+
+    library_hash = hashlib.md5(normalize_instructions(library).encode()).hexdigest()
+    chunks = own + [f"<library code>: {len(library)} lines, {library_hash}", f"<data>: {data_size} bytes, {data_hash}"]
+    return hash_obj(["\n".join(chunks), defs]), chunks
+
+
+SAMPLES_PATH = "temp/samples.bin"
+HISTOGRAM_BINS = 32
+
+
 def execute_source(executable_path):
+    env = os.environ.copy()
+    env["BENCHMARK_SAMPLES_PATH"] = SAMPLES_PATH
     p = subprocess.run(
         executable_path,
         check=True,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
+        env=env,
     )
     return p.stdout, p.stderr
 
 
+def read_samples(path):
+    # Parse records written by benchmark_flush_samples() in utils.h
+    samples = {}
+    if not os.path.exists(path):
+        return samples
+    raw = open(path, "rb").read()
+    os.remove(path)
+    pos = 0
+    while pos < len(raw):
+        (length,) = struct.unpack_from("=I", raw, pos)
+        pos += 4
+        testid = raw[pos : pos + length].decode()
+        pos += length
+        (count,) = struct.unpack_from("=Q", raw, pos)
+        pos += 8
+        samples.setdefault(testid, array.array("Q")).frombytes(raw[pos : pos + count * 8])
+        pos += count * 8
+    return samples
+
+
+def add_samples(result, values):
+    n = result["data"][-1]["n"]
+    result.setdefault("iteration_samples", {}).setdefault(n, []).extend(values)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile
+    idx = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+def summarize_samples(values):
+    values = sorted(values)
+    lo = values[0]
+    hi = values[-1]
+    log_scale = lo > 0 and hi > lo
+    counts = [0] * HISTOGRAM_BINS
+    for v in values:
+        if log_scale:
+            idx = int(HISTOGRAM_BINS * math.log(v / lo) / math.log(hi / lo))
+        elif hi > lo:
+            idx = int(HISTOGRAM_BINS * (v - lo) / (hi - lo))
+        else:
+            idx = 0
+        counts[min(idx, HISTOGRAM_BINS - 1)] += 1
+
+    return {
+        "iteration_count": len(values),
+        "time_ns_p50": percentile(values, 0.5),
+        "time_ns_p99": percentile(values, 0.99),
+        "time_ns_p999": percentile(values, 0.999),
+        "histogram": {"lo": lo, "hi": hi, "log": log_scale, "counts": counts},
+    }
+
+
 def handle_simple_test(testid, test, line, input_data):
     values = line.split(":")[1].strip().split(" ")
     cur = {}
@@ -274,10 +473,118 @@ def handle_simple_test(testid, test, line, input_data):
     return cur
 
 
+# Default of BENCHMARK_PAIRED_MAX_VARIANTS in utils.h
+PAIRED_MAX_VARIANTS = 8
+
+
+def handle_paired_test(testid, test, line, input_data):
+    values = line.split(":")[1].strip().split(" ")
+    variant_times = [float(value) for value in values[1:]]
+    if len(variant_times) != len(test["variants"]):
+        raise ValueError(f"Expected {len(test['variants'])} variant times for {testid}, got: {line}")
+
+    return {"n": float(values[0]), "time_ns": sum(variant_times), "variant_time_ns": variant_times}
+
+
+# Two-sided 97.5% quantiles of Student's t distribution for df = 1..30
+T_QUANTILES = [
+    12.706,
+    4.303,
+    3.182,
+    2.776,
+    2.571,
+    2.447,
+    2.365,
+    2.306,
+    2.262,
+    2.228,
+    2.201,
+    2.179,
+    2.160,
+    2.145,
+    2.131,
+    2.120,
+    2.110,
+    2.101,
+    2.093,
+    2.086,
+    2.080,
+    2.074,
+    2.069,
+    2.064,
+    2.060,
+    2.056,
+    2.052,
+    2.048,
+    2.045,
+    2.042,
+]
+
+
+def t_quantile(df):
+    return T_QUANTILES[df - 1] if df <= len(T_QUANTILES) else 1.96
+
+
+def process_paired_test(testid, test):
+    # Rounds hold the times of all variants on identical inputs, so compare them by
+    # per-round ratios to the baseline instead of by independent means
+    organized_data = {}
+    for entry in test["data"]:
+        organized_data.setdefault(entry["n"], []).append(entry["variant_time_ns"])
+
+    variants = test["variants"]
+    baseline = variants.index(test.get("baseline", variants[0]))
+    complexity_fn = get_complexity_fn(test["complexity"])
+    # Kept when stats are reused, so the history store can tell old measurements from new ones
+    measured_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+    stats = []
+    for n in sorted(organized_data.keys()):
+        rounds = organized_data[n]
+        stat_entry = {
+            "n": n,
+            "complexity": complexity_fn(n),
+            "samples": len(rounds),
+            "measured_at": measured_at,
+        }
+
+        for i, variant in enumerate(variants):
+            v = [r[i] for r in rounds]
+            mean = sum(v) / len(v)
+            stddev = math.sqrt(sum((x - mean) ** 2 for x in v) / (len(v) - 1)) if len(v) > 1 else 0
+            stat_entry[f"{variant}_time_ns_mean"] = mean
+            stat_entry[f"{variant}_time_ns_stddev"] = stddev
+
+        for i, variant in enumerate(variants):
+            if i == baseline:
+                continue
+            # Geometric mean of the ratios, with a t interval on their logarithms
+            logs = [math.log(r[i] / r[baseline]) for r in rounds if r[i] > 0 and r[baseline] > 0]
+            if not logs:
+                continue
+            mean = sum(logs) / len(logs)
+            stddev = math.sqrt(sum((x - mean) ** 2 for x in logs) / (len(logs) - 1)) if len(logs) > 1 else 0
+            half_width = t_quantile(len(logs) - 1) * stddev / math.sqrt(len(logs)) if len(logs) > 1 else 0
+            stat_entry[f"{variant}_ratio_mean"] = math.exp(mean)
+            stat_entry[f"{variant}_ratio_ci_low"] = math.exp(mean - half_width)
+            stat_entry[f"{variant}_ratio_ci_high"] = math.exp(mean + half_width)
+
+        stats.append(stat_entry)
+
+    # Stats reused from a previous run with identical machine code
+    stats.extend(test.pop("reused_stats", []))
+    stats.sort(key=lambda x: x["n"])
+
+    test["stats"] = stats
+    del test["data"]
+    return test
+
+
 def process_simple_test(testid, test):
     # Organize all data by n value and metric type
     organized_data = {}
     all_metrics = set()
+    samples = test.pop("iteration_samples", {})
 
     for entry in test["data"]:
         n = entry["n"]
@@ -312,6 +619,7 @@ def process_simple_test(testid, test):
                 all_metrics.add(key)
 
     complexity_fn = get_complexity_fn(test["complexity"])
+    measured_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
     # Compute statistics for each n and each metric
     stats = []
@@ -322,6 +630,7 @@ def process_simple_test(testid, test):
         stat_entry = {
             "n": n,
             "complexity": complexity_fn(n),
+            "measured_at": measured_at,
         }
 
         # Process each metric
@@ -393,8 +702,16 @@ def process_simple_test(testid, test):
                 stat_entry["constant_min"] = min(v) / complexity
                 stat_entry["constant_max"] = max(v) / complexity
 
+        # Per-iteration distribution, if the source captured samples
+        if n in samples:
+            stat_entry.update(summarize_samples(samples[n]))
+
         stats.append(stat_entry)
 
+    # Stats reused from a previous run with identical machine code
+    stats.extend(test.pop("reused_stats", []))
+    stats.sort(key=lambda x: x["n"])
+
     constant_max = max(map(lambda x: x["constant_mean"], stats))
     test["constant_max"] = constant_max
     test["stats"] = stats
@@ -402,9 +719,38 @@ def process_simple_test(testid, test):
     return test
 
 
+def find_reusable_stats(source, n, machine_code_hash):
+    # Old stats for n of every test in the source, if all were measured from identical machine code
+    global tests, old_results
+
+    ret = {}
+    for testid in source["tests"]:
+        old = old_results.get(testid)
+        if old is None:
+            return None
+        old_hash = old.get("machine_code", {}).get(str(n))
+        if old_hash is None and old.get("test_hash") == tests[testid]["test_hash"]:
+            # Measured before fingerprinting was introduced, from unchanged sources
+            old_hash = machine_code_hash
+        if old_hash != machine_code_hash:
+            if old_hash is not None:
+                print(
+                    colorize(
+                        f"Machine code of {source['path']} n={n} changed ({old_hash[:8]} -> {machine_code_hash[:8]}), re-measuring.",
+                        "yellow",
+                    )
+                )
+            return None
+        stat = next((x for x in old.get("stats", []) if x["n"] == n), None)
+        if stat is None:
+            return None
+        ret[testid] = stat
+    return ret
+
+
 def run_source(source, profile):
-    global dry_run, process_priority, cpu_affinity
-    global tests
+    global dry_run, process_priority, cpu_affinity, tsc_freq
+    global tests, fingerprinting, disassembly
 
     ret = {}
     inputs = []
@@ -431,31 +777,258 @@ def run_source(source, profile):
                             else:
                                 fake_input += f"{random.randint(1000, 100000)} "
                         ret[testid]["data"].append(handle_simple_test(testid, test, fake_input, input_data))
+                        if source.get("samples", False):
+                            add_samples(ret[testid], [random.randint(1000, 100000) for _ in range(100)])
+                    elif test["type"] == "paired":
+                        fake_input = f"{testid}:\t{input_data['defs']['BENCHMARK_N']}"
+                        for variant in test["variants"]:
+                            fake_input += f" {random.randint(1000, 100000)}"
+                        ret[testid]["data"].append(handle_paired_test(testid, test, fake_input, input_data))
         else:
-            output_path = compile_source(
-                source,
-                profile,
-                input_data.get("defs", {}),
-            )
+            output_path, machine_code_hash = prepare_input(source, profile, input_data, ret)
+            if output_path is None:
+                continue
             for repeat in range(source["repeats"]):
-                stdout, stderr = execute_source(output_path)
-                if verbose:
-                    print(colorize(stdout.decode().strip(), "gray"))
-                if stderr:
-                    print(colorize(f"Error running {source['path']} with input {input_data}:", "red"))
-                    print(colorize(stderr.decode().strip(), "red"))
-                    exit(1)
-                for line in stdout.decode().splitlines():
-                    testid = line.split(":")[0].strip()
-                    test = tests[testid]
-                    if testid not in ret:
-                        ret[testid] = test.copy()
-                        ret[testid]["data"] = []
-                    if test["type"] == "simple":
-                        ret[testid]["data"].append(handle_simple_test(testid, test, line, input_data))
+                execute_input(source, output_path, input_data, machine_code_hash, ret)
+    return ret
+
+
+def prepare_input(source, profile, input_data, ret):
+    # Compile one input of a source. The executable path is None if its stats were
+    # reused from a previous run with identical machine code.
+    global tests, fingerprinting, disassembly
+
+    output_path = compile_source(
+        source,
+        profile,
+        input_data.get("defs", {}),
+    )
+    n = input_data["defs"]["BENCHMARK_N"]
+    machine_code_hash = None
+    fingerprint = fingerprint_executable(output_path, input_data.get("defs", {})) if fingerprinting else None
+    if fingerprint is not None:
+        machine_code_hash, chunks = fingerprint
+        # Most functions are identical across n, so each is stored once and executables list their hashes
+        chunk_hashes = []
+        for chunk in chunks:
+            chunk_hash = hashlib.md5(chunk.encode()).hexdigest()
+            disassembly["functions"][chunk_hash] = chunk
+            chunk_hashes.append(chunk_hash)
+        disassembly["executables"][machine_code_hash] = chunk_hashes
+
+    reused = find_reusable_stats(source, n, machine_code_hash) if machine_code_hash else None
+    if reused is not None:
+        print(colorize(f"Reusing results for {source['path']} n={n}: machine code unchanged.", "gray"))
+        for testid, stat in reused.items():
+            if testid not in ret:
+                ret[testid] = tests[testid].copy()
+                ret[testid]["data"] = []
+            ret[testid].setdefault("reused_stats", []).append(stat)
+            ret[testid].setdefault("machine_code", {})[str(n)] = machine_code_hash
+        return None, machine_code_hash
+
+    return output_path, machine_code_hash
+
+
+def execute_input(source, output_path, input_data, machine_code_hash, ret):
+    global tests, tsc_freq
+
+    stdout, stderr = execute_source(output_path)
+    if verbose:
+        print(colorize(stdout.decode().strip(), "gray"))
+    if stderr:
+        print(colorize(f"Error running {source['path']} with input {input_data}:", "red"))
+        print(colorize(stderr.decode().strip(), "red"))
+        exit(1)
+    for line in stdout.decode().splitlines():
+        testid = line.split(":")[0].strip()
+        test = tests[testid]
+        if testid not in ret:
+            ret[testid] = test.copy()
+            ret[testid]["data"] = []
+        if test["type"] == "simple":
+            ret[testid]["data"].append(handle_simple_test(testid, test, line, input_data))
+        elif test["type"] == "paired":
+            ret[testid]["data"].append(handle_paired_test(testid, test, line, input_data))
+    for testid, ticks in read_samples(SAMPLES_PATH).items():
+        if testid in ret:
+            add_samples(ret[testid], [t / tsc_freq for t in ticks])
+    if machine_code_hash:
+        n = input_data["defs"]["BENCHMARK_N"]
+        for testid in source["tests"]:
+            if testid in ret:
+                ret[testid].setdefault("machine_code", {})[str(n)] = machine_code_hash
+
+
+BUDGET_DIR = "temp_budget"
+COARSE_POINTS = 5
+COARSE_REPEATS = 3
+
+
+def estimate_execution_cost(source, input_data):
+    # Seconds spent in the timed regions of one execution, from previous results and the complexity model
+    global tests, previous_results
+
+    n = input_data["defs"]["BENCHMARK_N"]
+    micro_repeats = input_data["defs"].get("BENCHMARK_MICRO_REPEATS", 1)
+    cost = 0
+    for testid in source["tests"]:
+        test = tests[testid]
+        stats = [x for x in previous_results.get(testid, {}).get("stats", []) if "constant_mean" in x]
+        if stats:
+            nearest = min(stats, key=lambda x: abs(math.log(x["n"]) - math.log(n)))
+            constant = nearest["constant_mean"]
+        else:
+            constant = 1
+        cost += constant * get_complexity_fn(test["complexity"])(n) * micro_repeats / 1e9
+    return cost
+
+
+def relative_ci_width(source, n, ret):
+    # Widest approximate 95% confidence interval of the mean time at n, relative to the mean
+    width = 0
+    for testid in source["tests"]:
+        values = [entry["time_ns"] for entry in ret.get(testid, {}).get("data", []) if entry["n"] == n]
+        if len(values) < 2:
+            return math.inf
+        mean = sum(values) / len(values)
+        stddev = math.sqrt(sum((x - mean) ** 2 for x in values) / (len(values) - 1))
+        if mean > 0:
+            width = max(width, 1.96 * stddev / math.sqrt(len(values)) / mean)
+    return width
+
+
+def run_budgeted(sources, profile, time_budget):
+    # Covers every source on a coarse grid of n first, then spends the remaining time on
+    # the points with the widest confidence intervals. Returns whatever was measured.
+    global tests
+
+    start = time.monotonic()
+    deadline = start + time_budget
+    ret = {}
+    points = []
+    coarse = []
+    for source in sources:
+        if source["input"]["type"] == "generator":
+            inputs = generator(**source["input"]["params"])
+        else:
+            raise ValueError(f"Unsupported input type: {source['input']['type']}")
+        source_points = []
+        for input_data in inputs:
+            point = {
+                "index": len(points),
+                "source": source,
+                "input": input_data,
+                "n": input_data["defs"]["BENCHMARK_N"],
+                "estimate": estimate_execution_cost(source, input_data),
+                "path": None,
+                "runs": 0,
+                "done": False,
+            }
+            points.append(point)
+            source_points.append(point)
+        k = min(COARSE_POINTS, len(source_points))
+        indices = sorted(set(round(i * (len(source_points) - 1) / max(k - 1, 1)) for i in range(k)))
+        coarse.append([source_points[i] for i in indices])
+
+    compile_cost = 1.0
+    scale = {}
+
+    def point_cost(point):
+        if "measured_cost" in point:
+            cost = point["measured_cost"]
+        else:
+            cost = point["estimate"] * scale.get(point["source"]["path"], 1) + 0.01
+        if point["path"] is None:
+            cost += compile_cost
+        return cost
+
+    def run_point(point):
+        nonlocal compile_cost
+        if time.monotonic() + point_cost(point) > deadline:
+            return False
+        source = point["source"]
+        if point["path"] is None:
+            st = time.monotonic()
+            output_path, point["machine_code_hash"] = prepare_input(source, profile, point["input"], ret)
+            compile_cost = time.monotonic() - st
+            if output_path is None:
+                point["done"] = True
+                return True
+            point["path"] = os.path.join(BUDGET_DIR, str(point["index"]))
+            shutil.copy(output_path, point["path"])
+        st = time.monotonic()
+        execute_input(source, point["path"], point["input"], point["machine_code_hash"], ret)
+        elapsed = time.monotonic() - st
+        point["measured_cost"] = (point.get("measured_cost", elapsed) * point["runs"] + elapsed) / (point["runs"] + 1)
+        point["runs"] += 1
+        scale[source["path"]] = point["measured_cost"] / max(point["estimate"], 1e-9)
+        if point["runs"] >= source["repeats"]:
+            point["done"] = True
+        return True
+
+    os.makedirs(BUDGET_DIR, exist_ok=True)
+    try:
+        for _ in range(COARSE_REPEATS):
+            for i in range(max(map(len, coarse), default=0)):
+                for source_points in coarse:
+                    if i < len(source_points) and not source_points[i]["done"]:
+                        run_point(source_points[i])
+
+        # A point that does not fit now never will, as the remaining time only shrinks
+        skipped = set()
+        while True:
+            candidates = [p for p in points if not p["done"] and p["index"] not in skipped]
+            if not candidates:
+                break
+            point = max(candidates, key=lambda p: (relative_ci_width(p["source"], p["n"], ret), -point_cost(p)))
+            if not run_point(point):
+                skipped.add(point["index"])
+    except KeyboardInterrupt:
+        print(colorize("Interrupted by user.", "red"))
+    finally:
+        shutil.rmtree(BUDGET_DIR, ignore_errors=True)
+
+    measured = sum(1 for p in points if p["runs"] > 0 or p["done"])
+    print(
+        colorize(
+            f"Measured {measured}/{len(points)} points in {time.monotonic() - start:.1f}s of {time_budget:.1f}s budget.",
+            "green",
+        )
+    )
+    carry_over_stats(sources, ret)
     return ret
 
 
+def carry_over_stats(sources, ret):
+    # Keep old stats for every n this run did not reach, so a short budget never shrinks the results.
+    # Stats of edited sources are only kept with a machine code hash, which the next run re-checks.
+    global tests, old_results
+
+    for source in sources:
+        for testid in source["tests"]:
+            old = old_results.get(testid)
+            if old is None:
+                continue
+            verified = old.get("test_hash") == tests[testid]["test_hash"]
+            # Stats store n as a float, machine code is keyed by the n passed to the compiler
+            machine_code = {float(k): (k, v) for k, v in old.get("machine_code", {}).items()}
+            reached = set()
+            if testid in ret:
+                reached.update(entry["n"] for entry in ret[testid]["data"])
+                reached.update(x["n"] for x in ret[testid].get("reused_stats", []))
+            for stat in old.get("stats", []):
+                key, machine_code_hash = machine_code.get(float(stat["n"]), (None, None))
+                if stat["n"] in reached or not (verified or machine_code_hash):
+                    continue
+                if testid not in ret:
+                    ret[testid] = tests[testid].copy()
+                    ret[testid]["data"] = []
+                ret[testid].setdefault("reused_stats", []).append(stat)
+                if machine_code_hash:
+                    ret[testid].setdefault("machine_code", {})[key] = machine_code_hash
+
+
 def collect_environment():
     global tsc_freq
 
@@ -509,8 +1082,8 @@ def hash_obj(obj):
 
 
 def run(profile, source_path, output_file):
-    global rerun, test_filter, comment_file
-    global tsc_freq
+    global rerun, test_filter, comment_file, time_budget, history_db, device, results_index_file
+    global tsc_freq, fingerprinting, disassembly, previous_results
     if os.path.exists("tsc_freq.txt"):
         tsc_freq = float(open("tsc_freq.txt", "r").read().strip())
     else:
@@ -534,9 +1107,11 @@ def run(profile, source_path, output_file):
 
         cfg = json.load(open(cfg_path, "r", encoding="utf-8"))
         source_hash = []
+        source_config_hashes = []
         source_files = []
         for source in cfg["sources"]:
             source_config_hash = hash_obj(source)
+            source_config_hashes.append(source_config_hash)
             if test_filter:
                 source["tests"] = [testid for testid in cfg["tests"].keys() if re.match(test_filter, testid)]
             else:
@@ -556,9 +1131,21 @@ def run(profile, source_path, output_file):
         for testid, test in cfg["tests"].items():
             if test_filter and (re.match(test_filter, testid) is None):
                 continue
+            if test["type"] == "paired" and not 1 <= len(test["variants"]) <= PAIRED_MAX_VARIANTS:
+                print(
+                    colorize(
+                        f"Paired test {testid} has {len(test['variants'])} variants, expected 1 to {PAIRED_MAX_VARIANTS}.",
+                        "red",
+                    )
+                )
+                exit(1)
             test["source_files"] = source_files
             test["source_hash"] = source_hash
             test["test_hash"] = hash_obj(test)
+            # Like test_hash but ignoring source text, whose changes are judged by machine code instead
+            test["config_hash"] = hash_obj(
+                [{k: v for k, v in test.items() if k not in ["source_hash", "test_hash"]}, source_config_hashes]
+            )
             tests[testid] = test
 
     if os.path.isfile(source_path):
@@ -571,7 +1158,20 @@ def run(profile, source_path, output_file):
 
     print(colorize(f"Found {len(sources)} source files and {len(tests)} tests.", "green"))
 
+    fingerprinting = (not dry_run) and shutil.which("objdump") is not None
+    if not fingerprinting and not dry_run:
+        print(colorize("objdump not found, machine code fingerprinting disabled.", "yellow"))
+
+    disassembly_file = os.path.splitext(output_file)[0] + ".disasm.json"
+    disassembly = {"functions": {}, "executables": {}}
+    if os.path.exists(disassembly_file):
+        disassembly.update(json.load(open(disassembly_file, "r", encoding="utf-8")))
+
     old_results = {}
+    previous_results = {}
+    if os.path.exists(output_file):
+        # Any previous measurement is good enough to estimate run times
+        previous_results = json.load(open(output_file, "r", encoding="utf-8")).get("results", {})
     if (not rerun) and os.path.exists(output_file):
         old_results_file = json.load(open(output_file, "r", encoding="utf-8"))
         old_profile_hash = hash_obj(old_results_file.get("profile", {}))
@@ -583,13 +1183,22 @@ def run(profile, source_path, output_file):
                     continue
                 current_test_hash = tests[k].get("test_hash", -1)
                 if old_test_hash != current_test_hash:
-                    continue
+                    # Edited sources may still be reused if their machine code turns out unchanged
+                    if not fingerprinting or v.get("config_hash") != tests[k]["config_hash"]:
+                        continue
+                # Carried over or reused stats keep the time of the run that measured them,
+                # so the history store does not take them for new measurements
+                timestamp = old_results_file.get("environment", {}).get("timestamp")
+                if timestamp:
+                    for stat in v.get("stats", []):
+                        stat.setdefault("measured_at", timestamp)
                 old_results[k] = v
         print(colorize(f"Loaded {len(old_results)} existing test results from {output_file}", "green"))
 
     unused_sources = set()
     for source in sources:
-        flag = True
+        # With fingerprinting every source is compiled to compare machine code
+        flag = not fingerprinting
         for testid in source["tests"]:
             if testid not in old_results:
                 flag = False
@@ -597,22 +1206,38 @@ def run(profile, source_path, output_file):
         if flag:
             unused_sources.add(source["path"])
 
-    try:
-        for source in sources:
-            if source["path"] in unused_sources:
-                print(colorize(f"Skipping {source['path']} as it is unused.", "yellow"))
-                continue
-            results.update(run_source(source, profile))
-            for k in source["tests"]:
-                if k in results:
-                    v = results[k]
-                    if v["type"] == "simple":
-                        results[k] = process_simple_test(k, v)
+    def process_source_results(source):
+        for k in source["tests"]:
+            if k in results:
+                v = results[k]
+                if v["type"] == "simple":
+                    results[k] = process_simple_test(k, v)
+                elif v["type"] == "paired":
+                    results[k] = process_paired_test(k, v)
+            else:
+                if k in old_results:
+                    results[k] = old_results[k]
                 else:
-                    if k in old_results:
-                        results[k] = old_results[k]
-                    else:
-                        print(colorize(f"Warning: Test {k} defined but not run.", "red"))
+                    print(colorize(f"Warning: Test {k} defined but not run.", "red"))
+
+    try:
+        if time_budget is not None and not dry_run:
+            budgeted_sources = []
+            for source in sources:
+                if source["path"] in unused_sources:
+                    print(colorize(f"Skipping {source['path']} as it is unused.", "yellow"))
+                    continue
+                budgeted_sources.append(source)
+            results.update(run_budgeted(budgeted_sources, profile, time_budget))
+            for source in budgeted_sources:
+                process_source_results(source)
+        else:
+            for source in sources:
+                if source["path"] in unused_sources:
+                    print(colorize(f"Skipping {source['path']} as it is unused.", "yellow"))
+                    continue
+                results.update(run_source(source, profile))
+                process_source_results(source)
     except KeyboardInterrupt:
         print(colorize("Interrupted by user.", "red"))
 
@@ -629,6 +1254,27 @@ def run(profile, source_path, output_file):
         separators=(",", ":"),
     )
 
+    if history_db and not dry_run:
+        # Same naming rule as `history.py ingest` when no device is given
+        added = history.ingest(history_db, output, device or history.device_name(output_file, results_index_file))
+        print(colorize(f"Added {added} new stats to {history_db}", "green"))
+
+    # Disassembly is kept out of the results file to keep the dashboard payload small
+    referenced = set()
+    for v in sorted_results.values():
+        referenced.update(v.get("machine_code", {}).values())
+    executables = {k: disassembly["executables"][k] for k in sorted(referenced) if k in disassembly["executables"]}
+    if executables:
+        functions = set(chunk_hash for chunk_hashes in executables.values() for chunk_hash in chunk_hashes)
+        json.dump(
+            {
+                "functions": {k: disassembly["functions"][k] for k in sorted(functions)},
+                "executables": executables,
+            },
+            open(disassembly_file, "w", encoding="utf-8"),
+            separators=(",", ":"),
+        )
+
 
 def main():
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -653,6 +1299,13 @@ def main():
     parser.add_argument(
         "--results-index", type=str, help="Path to results index file", required=False, default="results_index.json"
     )
+    parser.add_argument(
+        "--history-db",
+        type=str,
+        help="Results database to append every run to, empty to disable",
+        required=False,
+        default="history.db",
+    )
     parser.add_argument("--rerun", "-f", action="store_true", help="Do not skip existing tests", required=False, default=False)
     parser.add_argument(
         "-p",
@@ -674,6 +1327,13 @@ def main():
         "--pin", "--cpu-affinity", type=int, help="Pin benchmark process to this CPU core", required=False, default=None
     )
     parser.add_argument("--dry-run", action="store_true", help="Doesn't actually run tests", required=False, default=False)
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        help="Stop after this many minutes, measuring a coarse grid first and then the least certain points",
+        required=False,
+        default=None,
+    )
     parser.add_argument("--test-filter", type=str, help="Run only tests matching this regex", required=False, default=None)
     parser.add_argument("--list-profiles", action="store_true", help="List available profiles", required=False, default=False)
     parser.add_argument(
@@ -690,7 +1350,8 @@ def main():
             print(colorize(f"  {k}: {v['name']}", "yellow"))
         exit(0)
 
-    global rerun, dry_run, process_priority, cpu_affinity, test_filter, comment_file, verbose
+    global rerun, dry_run, process_priority, cpu_affinity, test_filter, comment_file, verbose, time_budget
+    global history_db, device, results_index_file
 
     rerun = args.rerun
     dry_run = args.dry_run
@@ -704,12 +1365,19 @@ def main():
     test_filter = args.test_filter
     comment_file = args.comment_file
     verbose = args.verbose
+    history_db = args.history_db
+    results_index_file = args.results_index
+    time_budget = None
+    if args.time_budget is not None:
+        # Split evenly between profiles when running all of them
+        time_budget = args.time_budget * 60 / (len(profiles) if args.all_profiles else 1)
 
     if args.all_profiles:
         if not args.output:
             args.output = "results/"
         if not args.device:
             args.device = input("Enter device name: ").strip()
+        device = args.device
 
         if os.path.exists(args.output) is False:
             os.makedirs(args.output)
@@ -728,6 +1396,7 @@ def main():
             results_index.sort(key=lambda x: x["name"])
             json.dump(results_index, open(args.results_index, "w"))
     else:
+        device = args.device
         if not args.output:
             args.output = "results.json"
         if args.profile:
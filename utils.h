@@ -200,6 +200,140 @@ double tsc_to_ns(ull tsc) {
     return (double)tsc / (BENCHMARK_TSC_FREQ);
 }
 
+// Per-iteration sample capture. Enabled by the harness with -DBENCHMARK_SAMPLES
+// when a source sets "samples": true. TSC deltas are kept in a preallocated
+// buffer and written to the binary file named by $BENCHMARK_SAMPLES_PATH when
+// benchmark_flush_samples() is called. When disabled, all calls compile away.
+//
+// The rdtscp pair around each iteration costs tens of nanoseconds, so samples are
+// taken in a separate pass guarded by benchmark_samples_enabled, never inside the
+// loop timed for the printed total. The cost of an empty pair is calibrated once
+// and subtracted from every sample.
+//
+// Record format (native endianness, repeated once per flush):
+//   uint32 testid_len, char testid[testid_len], uint64 count, uint64 ticks[count]
+#include <algorithm>
+
+#ifndef BENCHMARK_SAMPLES_CAPACITY
+#define BENCHMARK_SAMPLES_CAPACITY 65536
+#endif
+
+#ifdef BENCHMARK_SAMPLES
+#include <stdio.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+
+const bool benchmark_samples_enabled = true;
+
+ull benchmark_samples_buf[BENCHMARK_SAMPLES_CAPACITY];
+ull benchmark_samples_count = 0;
+
+inline BENCHMARK_ALWAYS_INLINE ull benchmark_sample_start() {
+    return get_tsc();
+}
+
+inline BENCHMARK_ALWAYS_INLINE void benchmark_sample_stop(ull st) {
+    ull et = get_tsc();
+    if (benchmark_samples_count < BENCHMARK_SAMPLES_CAPACITY) {
+        benchmark_samples_buf[benchmark_samples_count++] = et - st;
+    }
+}
+
+ull benchmark_sample_overhead() {
+    static ull overhead = ~0ull;
+    if (overhead == ~0ull) {
+        for (int i = 0; i < 1000; ++i) {
+            ull st = get_tsc();
+            ull et = get_tsc();
+            overhead = std::min(overhead, et - st);
+        }
+    }
+    return overhead;
+}
+
+void benchmark_flush_samples(const char *testid) {
+    ull overhead = benchmark_sample_overhead();
+    for (ull i = 0; i < benchmark_samples_count; ++i) {
+        benchmark_samples_buf[i] -= std::min(benchmark_samples_buf[i], overhead);
+    }
+    const char *path = getenv("BENCHMARK_SAMPLES_PATH");
+    if (path != NULL) {
+        FILE *f = fopen(path, "ab");
+        if (f != NULL) {
+            uint32_t len = strlen(testid);
+            uint64_t count = benchmark_samples_count;
+            fwrite(&len, sizeof(len), 1, f);
+            fwrite(testid, 1, len, f);
+            fwrite(&count, sizeof(count), 1, f);
+            fwrite(benchmark_samples_buf, sizeof(ull), benchmark_samples_count, f);
+            fclose(f);
+        }
+    }
+    benchmark_samples_count = 0;
+}
+#else
+const bool benchmark_samples_enabled = false;
+
+inline BENCHMARK_ALWAYS_INLINE ull benchmark_sample_start() {
+    return 0;
+}
+
+inline BENCHMARK_ALWAYS_INLINE void benchmark_sample_stop(ull st) {
+}
+
+inline BENCHMARK_ALWAYS_INLINE void benchmark_flush_samples(const char *testid) {
+}
+#endif
+
+// Paired benchmarking of several variants of one workload. Each round draws a
+// seed, then runs every variant once in a random order: prepare(variant, seed)
+// is untimed and must build the same input for the same seed, run(variant) is
+// timed. One line per round is printed: "testid:\tN t_0 t_1 ...", with the
+// times in ns in variant order, for tests of type "paired".
+#ifndef BENCHMARK_PAIRED_MAX_VARIANTS
+#define BENCHMARK_PAIRED_MAX_VARIANTS 8
+#endif
+
+#include <stdio.h>
+#include <stdlib.h>
+
+template <class Prepare, class Run>
+void benchmark_paired(const char *testid, int variants, int rounds, Prepare prepare, Run run) {
+    if (variants < 1 || variants > BENCHMARK_PAIRED_MAX_VARIANTS) {
+        fprintf(stderr, "%s: %d variants, expected 1 to BENCHMARK_PAIRED_MAX_VARIANTS (%d)\n", testid, variants,
+                BENCHMARK_PAIRED_MAX_VARIANTS);
+        exit(1);
+    }
+    ull times[BENCHMARK_PAIRED_MAX_VARIANTS];
+    int order[BENCHMARK_PAIRED_MAX_VARIANTS];
+    for (int r = 0; r < rounds; ++r) {
+        ull seed = rng();
+        for (int i = 0; i < variants; ++i) {
+            order[i] = i;
+        }
+        for (int i = variants - 1; i > 0; --i) {
+            int j = rng() % (i + 1);
+            int t = order[i];
+            order[i] = order[j];
+            order[j] = t;
+        }
+        for (int i = 0; i < variants; ++i) {
+            int v = order[i];
+            prepare(v, seed);
+            ull st = get_cpu_time();
+            run(v);
+            ull et = get_cpu_time();
+            times[v] = et - st;
+        }
+        printf("%s:\t%lld", testid, (ll)BENCHMARK_N);
+        for (int i = 0; i < variants; ++i) {
+            printf(" %llu", times[i]);
+        }
+        printf("\n");
+    }
+}
+
 #ifdef BENCHMARK_PROCESS_PRIORITY
 #include <limits.h>
 #include <sys/resource.h>
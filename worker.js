@@ -0,0 +1,332 @@
+// Parses result files and extracts plot series off the main thread.
+// Parsed files are cached in IndexedDB keyed by a hash of their contents.
+
+const DB_NAME = "algo-benchmarks";
+const DB_STORE = "parsed";
+// Series longer than this are downsampled before plotting
+const MAX_POINTS = 256;
+
+const parsed = new Map();
+const loads = new Map();
+let dbPromise = null;
+
+function openDb() {
+  if (!dbPromise) {
+    dbPromise = new Promise((resolve) => {
+      if (!self.indexedDB) {
+        resolve(null);
+        return;
+      }
+      const req = indexedDB.open(DB_NAME, 1);
+      req.onupgradeneeded = () => req.result.createObjectStore(DB_STORE);
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => resolve(null);
+    });
+  }
+  return dbPromise;
+}
+
+function dbGet(db, key) {
+  return new Promise((resolve) => {
+    if (!db) {
+      resolve(undefined);
+      return;
+    }
+    const req = db.transaction(DB_STORE, "readonly").objectStore(DB_STORE).get(key);
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => resolve(undefined);
+  });
+}
+
+function dbPut(db, key, value) {
+  if (!db) {
+    return;
+  }
+  db.transaction(DB_STORE, "readwrite").objectStore(DB_STORE).put(value, key);
+}
+
+async function hashText(text) {
+  try {
+    const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+  } catch (err) {
+    // crypto.subtle is only available in secure contexts, fall back to FNV-1a
+    let h = 0x811c9dc5;
+    for (let i = 0; i < text.length; ++i) {
+      h ^= text.charCodeAt(i);
+      h = Math.imul(h, 0x01000193);
+    }
+    return `fnv-${(h >>> 0).toString(16)}-${text.length}`;
+  }
+}
+
+// Keeps only what the page needs: test metadata and one numeric column per stat
+function extractResults(data) {
+  const tests = {};
+  for (const [key, result] of Object.entries(data.results || {})) {
+    const stats = result.stats || [];
+    const columns = {};
+    stats.forEach((d, i) => {
+      for (const [field, value] of Object.entries(d)) {
+        if (typeof value !== "number") {
+          continue;
+        }
+        if (!columns[field]) {
+          columns[field] = new Array(stats.length).fill(null);
+        }
+        columns[field][i] = value;
+      }
+    });
+    tests[key] = {
+      meta: {
+        type: result.type,
+        complexity: result.complexity,
+        constant_max: result.constant_max ?? result.max_c,
+        description_en: result.description_en,
+        variants: result.variants,
+        baseline: result.baseline,
+      },
+      columns,
+    };
+  }
+  return {
+    profile: data.profile,
+    environment: data.environment,
+    comment: data.comment,
+    tests,
+  };
+}
+
+async function fetchResults(path) {
+  const text = await fetch(path).then((r) => r.text());
+  const hash = await hashText(text);
+  const db = await openDb();
+  let entry = await dbGet(db, hash);
+  if (!entry) {
+    entry = extractResults(JSON.parse(text));
+    dbPut(db, hash, entry);
+  }
+  parsed.set(path, entry);
+
+  const metas = {};
+  for (const [key, test] of Object.entries(entry.tests)) {
+    metas[key] = test.meta;
+  }
+  return { hash, profile: entry.profile, environment: entry.environment, comment: entry.comment, tests: metas };
+}
+
+// Each file is fetched and parsed once per page load, concurrent requests share the same promise
+function loadResults(path) {
+  if (!loads.has(path)) {
+    const promise = fetchResults(path);
+    promise.catch(() => loads.delete(path));
+    loads.set(path, promise);
+  }
+  return loads.get(path);
+}
+
+function getMetricAccessors(metric) {
+  if (metric === "time_ns") {
+    return {
+      meanKeys: ["time_ns_mean", "mean"],
+      stdKeys: ["time_ns_stddev", "stddev"],
+      minKeys: ["time_ns_min", "min"],
+      maxKeys: ["time_ns_max", "max"],
+    };
+  }
+  if (metric === "constant") {
+    return {
+      meanKeys: ["constant_mean", "mean_c"],
+      stdKeys: ["constant_stddev", "stddev_c"],
+      minKeys: ["constant_min", "min_c"],
+      maxKeys: ["constant_max", "max_c"],
+    };
+  }
+  return {
+    meanKeys: [`${metric}_mean`, metric],
+    stdKeys: [`${metric}_stddev`],
+    minKeys: [`${metric}_min`],
+    maxKeys: [`${metric}_max`],
+  };
+}
+
+function getFirstFiniteValue(columns, keys, i) {
+  for (const key of keys) {
+    const column = columns[key];
+    if (column && column[i] !== null && column[i] !== undefined) {
+      const num = Number(column[i]);
+      if (Number.isFinite(num)) {
+        return num;
+      }
+    }
+  }
+  return undefined;
+}
+
+// Buckets consecutive points, keeping the mean and the envelope of the error bars
+function downsample(series) {
+  const len = series.x.length;
+  if (len <= MAX_POINTS) {
+    return series;
+  }
+  const size = Math.ceil(len / MAX_POINTS);
+  const out = { x: [], y: [], errors: [], errors2: [] };
+  for (let i = 0; i < len; i += size) {
+    const end = Math.min(len, i + size);
+    let sum = 0;
+    let hi = -Infinity;
+    let lo = Infinity;
+    for (let j = i; j < end; ++j) {
+      sum += series.y[j];
+      hi = Math.max(hi, series.y[j] + series.errors[j]);
+      lo = Math.min(lo, series.y[j] - (series.errors2 ? series.errors2[j] : series.errors[j]));
+    }
+    const mean = sum / (end - i);
+    out.x.push(series.x[Math.floor((i + end - 1) / 2)]);
+    out.y.push(mean);
+    out.errors.push(Math.max(0, hi - mean));
+    out.errors2.push(Math.max(0, mean - lo));
+  }
+  return out;
+}
+
+function simpleSeries(test, metric, showMinMax) {
+  const columns = test.columns;
+  const access = getMetricAccessors(metric);
+  const series = { x: [], y: [], errors: [], errors2: showMinMax ? [] : null };
+  const count = (columns.n || []).length;
+  for (let i = 0; i < count; ++i) {
+    const meanVal = getFirstFiniteValue(columns, access.meanKeys, i);
+    if (!Number.isFinite(meanVal)) {
+      continue;
+    }
+    const stdVal = getFirstFiniteValue(columns, access.stdKeys, i);
+    const minVal = getFirstFiniteValue(columns, access.minKeys, i);
+    const maxVal = getFirstFiniteValue(columns, access.maxKeys, i);
+
+    series.x.push(Number(columns.n[i]));
+    series.y.push(meanVal);
+
+    if (showMinMax) {
+      if (Number.isFinite(minVal) && Number.isFinite(maxVal)) {
+        series.errors2.push(Math.max(0, meanVal - minVal));
+        series.errors.push(Math.max(0, maxVal - meanVal));
+      } else if (Number.isFinite(stdVal)) {
+        series.errors2.push(stdVal);
+        series.errors.push(stdVal);
+      } else {
+        series.errors2.push(0);
+        series.errors.push(0);
+      }
+    } else if (Number.isFinite(stdVal)) {
+      series.errors.push(stdVal);
+    } else {
+      series.errors.push(0);
+    }
+  }
+  return [{ label: null, ...downsample(series) }];
+}
+
+// Paired tests are plotted as the ratio of each variant to the baseline, whatever the metric
+function pairedSeries(test) {
+  const columns = test.columns;
+  const baseline = test.meta.baseline || test.meta.variants[0];
+  const ret = [];
+  test.meta.variants.forEach((variant) => {
+    if (variant === baseline) {
+      return;
+    }
+    const series = { x: [], y: [], errors: [], errors2: [] };
+    const count = (columns.n || []).length;
+    for (let i = 0; i < count; ++i) {
+      const meanVal = getFirstFiniteValue(columns, [`${variant}_ratio_mean`], i);
+      if (!Number.isFinite(meanVal)) {
+        continue;
+      }
+      const lowVal = getFirstFiniteValue(columns, [`${variant}_ratio_ci_low`], i);
+      const highVal = getFirstFiniteValue(columns, [`${variant}_ratio_ci_high`], i);
+      series.x.push(Number(columns.n[i]));
+      series.y.push(meanVal);
+      series.errors2.push(Number.isFinite(lowVal) ? Math.max(0, meanVal - lowVal) : 0);
+      series.errors.push(Number.isFinite(highVal) ? Math.max(0, highVal - meanVal) : 0);
+    }
+    ret.push({ label: `${variant} / ${baseline}`, ...downsample(series) });
+  });
+  return ret;
+}
+
+function buildSeries(selection, metric, showMinMax) {
+  return selection.map(({ path, key }) => {
+    const test = parsed.get(path)?.tests[key];
+    if (!test) {
+      return [];
+    }
+    const series = test.meta.type === "paired" ? pairedSeries(test) : simpleSeries(test, metric, showMinMax);
+    return series.filter((s) => s.x.length > 0);
+  });
+}
+
+// Exported by `python3 history.py export`, optional
+let historyPromise = null;
+
+function loadHistory() {
+  if (!historyPromise) {
+    historyPromise = fetch("history.json")
+      .then((r) => (r.ok ? r.json() : null))
+      .catch(() => null);
+  }
+  return historyPromise;
+}
+
+// Name of the stat history.json stores for an entry of the metric dropdown
+function historyMetric(metric) {
+  if (metric === "time_ns" || metric === "constant") {
+    return `${metric}_mean`;
+  }
+  return /_p\d+$/.test(metric) ? metric : `${metric}_mean`;
+}
+
+// Trends of the selected tests, only for the devices and profiles currently loaded
+async function buildHistorySeries(keys, runs, metric) {
+  const history = await loadHistory();
+  const index = history ? history.metrics.indexOf(historyMetric(metric)) : -1;
+  if (index < 0) {
+    return [];
+  }
+  const ret = [];
+  keys.forEach((key) => {
+    (history.tests[key] || []).forEach((series) => {
+      if (!runs.some((run) => run.device === series.device && run.profile === series.profile)) {
+        return;
+      }
+      const points = series.points.filter((p) => p.values[index] !== null);
+      if (points.length === 0) {
+        return;
+      }
+      ret.push({
+        group: `${key} (${series.device} ${series.profile})`,
+        n: series.n,
+        x: points.map((p) => p.timestamp),
+        y: points.map((p) => p.values[index]),
+      });
+    });
+  });
+  return ret;
+}
+
+self.onmessage = async (e) => {
+  const { id, type } = e.data;
+  try {
+    if (type === "load") {
+      self.postMessage({ id, result: await loadResults(e.data.path) });
+    } else if (type === "series") {
+      self.postMessage({ id, result: buildSeries(e.data.selection, e.data.metric, e.data.showMinMax) });
+    } else if (type === "history") {
+      self.postMessage({ id, result: await buildHistorySeries(e.data.keys, e.data.runs, e.data.metric) });
+    } else {
+      throw new Error(`Unknown request: ${type}`);
+    }
+  } catch (err) {
+    self.postMessage({ id, error: String(err) });
+  }
+};